@@ -1,21 +1,19 @@
 import streamlit as st
-from hotel_receptionist import HotelReceptionist
+from hotel_receptionist import HotelReceptionist, ReceptionistLLM
 from hotel_system import CompleteHotelSystem
 
-# Initialize session state for persistence
-if 'initialized' not in st.session_state:
-    st.session_state.initialized = True
-    st.session_state.messages = []
-    st.session_state.hotel_system = CompleteHotelSystem("hotel_rooms.csv")
-    st.session_state.receptionist = HotelReceptionist(st.session_state.hotel_system)
-    # Add initial greeting
-    st.session_state.messages.append({"role": "bot", "text": "Welcome to our hotel! I'm your AI receptionist. How may I assist you today?"})
+# Build the room data and the Ollama client once per process and share them across sessions;
+# each session gets its own receptionist for its chat history and pending booking
+@st.cache_resource
+def get_hotel_system(path):
+    return CompleteHotelSystem(path)
 
-# Streamlit Page Configuration
-st.set_page_config(page_title="AI Hotel Receptionist", page_icon="🏨", layout="centered")
+@st.cache_resource
+def get_llm():
+    return ReceptionistLLM()
 
-# Apply Dark Theme Styling
-st.markdown("""
+# Dark theme styling, emitted on every run
+PAGE_CSS = """
     <style>
     body {
         background-color: #121212;
@@ -40,32 +38,61 @@ st.markdown("""
         color: #2196F3;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+def message_html(message):
+    css_class = "user-message" if message["role"] == "user" else "bot-message"
+    return f"<div class='{css_class}'>{message['text']}</div>"
+
+# Initialize session state for persistence
+if 'initialized' not in st.session_state:
+    st.session_state.initialized = True
+    st.session_state.messages = []
+    # HTML of every message formatted so far, and how many messages that covers
+    st.session_state.history_html = []
+    st.session_state.rendered_idx = 0
+    st.session_state.hotel_system = get_hotel_system("hotel_rooms.csv")
+    st.session_state.receptionist = HotelReceptionist(st.session_state.hotel_system, get_llm())
+    # Add initial greeting
+    st.session_state.messages.append({"role": "bot", "text": "Welcome to our hotel! I'm your AI receptionist. How may I assist you today?"})
+
+# Streamlit Page Configuration
+st.set_page_config(page_title="AI Hotel Receptionist", page_icon="🏨", layout="centered")
+
+# Apply Dark Theme Styling (Streamlit drops elements a run doesn't emit, so this runs every time)
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 # Chatbot Header
 st.title("🤖 AI Hotel Receptionist")
 st.markdown("Ask me anything about the hotel services, bookings, check-in/check-out, and more!")
 
-# Display Chat History
-for message in st.session_state.messages:
-    role, text = message["role"], message["text"]
-    css_class = "user-message" if role == "user" else "bot-message"
-    st.markdown(f"<div class='{css_class}'>{text}</div>", unsafe_allow_html=True)
+# Display Chat History: format only messages added since the last run and emit the whole
+# history as a single element instead of one element per message
+new_messages = st.session_state.messages[st.session_state.rendered_idx:]
+st.session_state.history_html.extend(message_html(message) for message in new_messages)
+st.session_state.rendered_idx = len(st.session_state.messages)
+st.markdown("\n\n".join(st.session_state.history_html), unsafe_allow_html=True)
+
+# Messages from this turn are rendered here, directly below the history and above the input form
+new_turn = st.container()
 
 # Create a form for user input to ensure proper processing
 with st.form(key="message_form", clear_on_submit=True):
     user_input = st.text_input("Type your message:", key="user_message")
     submit_button = st.form_submit_button("Send")
+
+# Handle the submission in the same script run; the next run picks the new messages up into the history
+if submit_button and user_input:
+    # Add user message to chat history
+    st.session_state.messages.append({"role": "user", "text": user_input})
+    new_turn.markdown(message_html(st.session_state.messages[-1]), unsafe_allow_html=True)
+    
+    # Stream the AI response into a placeholder as it is generated
+    placeholder = new_turn.empty()
+    response = ""
+    for chunk in st.session_state.receptionist.stream_response(user_input):
+        response += chunk
+        placeholder.markdown(message_html({"role": "bot", "text": response}), unsafe_allow_html=True)
     
-    if submit_button and user_input:
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "text": user_input})
-        
-        # Get AI response (force a re-run of the receptionist.get_response)
-        response = st.session_state.receptionist.handle_customer_query(user_input)
-        
-        # Add AI response to chat history
-        st.session_state.messages.append({"role": "bot", "text": response})
-        
-        # Force a re-run to update the UI with the new messages
-        st.rerun()  # Using st.rerun() instead of st.experimental_rerun()
\ No newline at end of file
+    # Add AI response to chat history
+    st.session_state.messages.append({"role": "bot", "text": response})
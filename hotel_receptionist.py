@@ -1,14 +1,41 @@
 # hotel_receptionist.py
+import re
+import threading
+import time
 import pandas as pd
-from langchain_ollama import OllamaLLM  # Updated import
-from datetime import datetime
+import ollama
+from collections import deque
 from hotel_system import CompleteHotelSystem
+from response_cache import ResponseCache
 
-class HotelReceptionist:
-    def __init__(self, hotel_system):
-        self.hotel_system = hotel_system
-        self.llm = OllamaLLM(model="llama3.2:1b")  # Using the updated class
-        self.chat_history = []
+LLM_MODEL = "llama3.2:1b"
+# Only the most recent chat history entries are kept
+MAX_CHAT_HISTORY = 1000
+# num_predict covers the ~50 words responses are trimmed to. num_ctx must stay the same
+# for every request, since Ollama reloads the model whenever it changes.
+LLM_OPTIONS = {'num_predict': 70, 'temperature': 0.3, 'num_ctx': 2048}
+
+# Matches the first 50 words of a response, including the whitespace between them
+MAX_WORDS_RE = re.compile(r"\s*(?:\S+\s+){49}\S+")
+
+# hotel_system actions whose messages are already final and are returned verbatim
+DIRECT_ACTIONS = {'booking_request', 'confirmed', 'cancel', 'error'}
+# Messages shorter than this are not worth an LLM round-trip
+MIN_LLM_MESSAGE_LENGTH = 60
+
+# Rephrased responses shared by all receptionists in the process, keyed by (hotel_data, normalized query)
+RESPONSE_CACHE = ResponseCache(ttl=600, max_entries=512)
+# Punctuation is ignored when matching queries against the cache
+QUERY_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+class ReceptionistLLM:
+    """Ollama client and prompts, shared by every receptionist in the process"""
+
+    def __init__(self):
+        # Each Streamlit session runs its script in its own thread, so blocking calls from
+        # different guests already overlap; set OLLAMA_NUM_PARALLEL on the Ollama server so
+        # it serves them in parallel rather than one after another.
+        self.client = ollama.Client()
         
         # System prompt for the AI receptionist
         self.system_prompt = (
@@ -31,51 +58,50 @@ class HotelReceptionist:
             "4. Keep the interaction professional and efficient\n\n"
             "Example format for responses:\n"
             "\"We have [number] [room type] rooms available at $[price] per night.\"\n"
-            "\"Our [room type] rooms feature [amenities] and are priced at $[price] per night.\""
+            "\"Our [room type] rooms feature [amenities] and are priced at $[price] per night.\"\n\n"
+            "Each message gives the guest's query and the hotel data to answer it with. "
+            "Reply with a natural, concise response as a hotel receptionist."
         )
+        
+        # Load the model while the guest is still typing their first message
+        threading.Thread(target=self.warm_up, daemon=True).start()
     
-    def get_response(self, user_input: str) -> str:
-        """Processes user input and returns a response."""
-
-        if "book" in user_input.lower():
-            return self.handle_booking_request(user_input)
-        elif "check-in" in user_input.lower():
-            return self.handle_checkin_request(user_input)
-        elif "check-out" in user_input.lower():
-            return self.handle_checkout_request(user_input)
-        elif "rooms" in user_input.lower():  # Redirect to a generic query handler
-            return self.handle_customer_query(user_input)
-        else:
-            return "I can help you with bookings, check-in/out, and room information. How can I assist you today?"
-
-
-    def handle_room_inquiry(self, user_input):
-        return self.hotel_system.process_user_query(user_input)['message']
+    def warm_up(self):
+        """Load the model and prime its cache with the system prompt by generating a single token"""
+        try:
+            self.client.chat(
+                model=LLM_MODEL,
+                messages=[{'role': 'system', 'content': self.system_prompt}],
+                options=dict(LLM_OPTIONS, num_predict=1)
+            )
+        except Exception as e:
+            # Not fatal: the first real query will load the model instead
+            print(f"Error warming up LLM: {e}")
 
+    def build_messages(self, hotel_data, user_query):
+        # The system prompt is sent unchanged as the first message so Ollama can reuse its cached prefix
+        return [
+            {'role': 'system', 'content': self.system_prompt},
+            {'role': 'user', 'content': f"Query: {user_query}\nData: {hotel_data}"}
+        ]
 
-
-    def save_to_chat_history(self, speaker, message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.chat_history.append({
-            "timestamp": timestamp,
-            "speaker": speaker,
-            "message": message
-        })
+    def response_cache_key(self, hotel_data, user_query):
+        normalized_query = ' '.join(QUERY_PUNCTUATION_RE.sub(' ', user_query.lower()).split())
+        return (hotel_data, normalized_query)
 
     def generate_llm_response(self, hotel_data, user_query):
-        # Combine the system prompt with the query and hotel data for context
-        prompt = (
-            f"{self.system_prompt}\n\n"
-            f"User query: \"{user_query}\"\n"
-            f"Hotel Data: \"{hotel_data}\"\n\n"
-            "Please provide a natural, concise response as a hotel receptionist. "
-            "Keep the response brief and friendly."
-        )
+        cache_key = self.response_cache_key(hotel_data, user_query)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.llm.invoke(prompt)
+            response = self.client.chat(
+                model=LLM_MODEL, messages=self.build_messages(hotel_data, user_query), options=LLM_OPTIONS
+            )['message']['content']
             # Trim the response to roughly 50 words
             response = ' '.join(response.split()[:50])
+            RESPONSE_CACHE.put(cache_key, response)
             return response
         except Exception as e:
             # Log the error for debugging purposes
@@ -83,21 +109,100 @@ class HotelReceptionist:
             # Fallback: Return hotel data or a default message
             return hotel_data if hotel_data else "I apologize, but I'm having trouble processing your request. How else may I assist you?"
 
+    def stream_llm_response(self, hotel_data, user_query):
+        """Yield the LLM response chunk by chunk, trimmed to roughly 50 words"""
+        cache_key = self.response_cache_key(hotel_data, user_query)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        messages = self.build_messages(hotel_data, user_query)
+        response = ""
+        
+        try:
+            for part in self.client.chat(model=LLM_MODEL, messages=messages, options=LLM_OPTIONS, stream=True):
+                chunk = part['message']['content']
+                candidate = response + chunk
+                # Stop once the 50th word is complete, yielding only up to it
+                trimmed = MAX_WORDS_RE.match(candidate)
+                if trimmed and len(candidate.split()) > 50:
+                    yield trimmed.group(0)[len(response):]
+                    response = trimmed.group(0)
+                    break
+                response = candidate
+                yield chunk
+            RESPONSE_CACHE.put(cache_key, ' '.join(response.split()))
+        except Exception as e:
+            # Log the error for debugging purposes
+            print(f"Error in LLM stream: {e}")
+            # Fallback: Return hotel data or a default message, unless part of the answer is already out
+            if not response.strip():
+                yield hotel_data if hotel_data else "I apologize, but I'm having trouble processing your request. How else may I assist you?"
+
+class HotelReceptionist:
+    """One guest's conversation: chat history and pending booking, around a shared hotel system and LLM"""
+
+    def __init__(self, hotel_system, llm=None):
+        self.hotel_system = hotel_system
+        self.llm = llm if llm is not None else ReceptionistLLM()
+        self.chat_history = deque(maxlen=MAX_CHAT_HISTORY)
+        # Room quoted to this guest and waiting for a yes/no; see CompleteHotelSystem.process_user_query
+        self.current_booking = None
+
+    def save_to_chat_history(self, speaker, message):
+        # Store the raw time; formatting it is left to whoever reads the history
+        self.chat_history.append({
+            "timestamp": time.time(),
+            "speaker": speaker,
+            "message": message
+        })
+
+    def needs_llm(self, hotel_response):
+        """Only informational messages of some length benefit from being rephrased"""
+        return (hotel_response['action'] not in DIRECT_ACTIONS
+                and len(hotel_response['message']) >= MIN_LLM_MESSAGE_LENGTH)
+
     def handle_customer_query(self, user_input):
         # Save customer input to history
         self.save_to_chat_history("Customer", user_input)
+        # Lowercase once for the hotel system; the LLM still sees the guest's original text
+        query = user_input.lower()
         
         # Get response from the hotel system (a dictionary with at least a 'message' key)
-        hotel_response = self.hotel_system.process_user_query(user_input)
+        hotel_response = self.hotel_system.process_user_query(query, normalized=True, booking_state=self)
         
-        # Generate a natural language response using the LLM
-        ai_response = self.generate_llm_response(hotel_response['message'], user_input)
+        # Generate a natural language response using the LLM, unless the message is already final
+        if self.needs_llm(hotel_response):
+            ai_response = self.llm.generate_llm_response(hotel_response['message'], user_input)
+        else:
+            ai_response = hotel_response['message']
         
         # Save AI response to history
         self.save_to_chat_history("AI", ai_response)
         
         return ai_response
 
+    def stream_response(self, user_input):
+        """Like handle_customer_query, but yields the AI response as it is generated"""
+        self.save_to_chat_history("Customer", user_input)
+        query = user_input.lower()
+        
+        hotel_response = self.hotel_system.process_user_query(query, normalized=True, booking_state=self)
+        
+        if not self.needs_llm(hotel_response):
+            self.save_to_chat_history("AI", hotel_response['message'])
+            yield hotel_response['message']
+            return
+        
+        ai_response = ""
+        for chunk in self.llm.stream_llm_response(hotel_response['message'], user_input):
+            ai_response += chunk
+            yield chunk
+        
+        # Save the complete AI response to history once streaming has finished
+        self.save_to_chat_history("AI", ' '.join(ai_response.split()))
+
     def start_conversation(self):
         greeting = "Welcome to our hotel! I'm your AI receptionist. How may I assist you today?"
         self.save_to_chat_history("AI", greeting)
@@ -122,6 +227,7 @@ def main():
     hotel_system = CompleteHotelSystem("hotel_rooms.csv")
     receptionist = HotelReceptionist(hotel_system)
     receptionist.start_conversation()
+    hotel_system.close()
 
 if __name__ == "__main__":
     main()
@@ -1,155 +1,210 @@
 # hotel_system.py
+import re
+import threading
 import pandas as pd
 from sqlalchemy import create_engine, text
 
+# Column types of the rooms table, applied while parsing so pandas skips type inference
+ROOM_DTYPES = {'id': 'int64', 'type': str, 'price': 'float64', 'availability': str}
+
+# Features and maximum occupancy per room type; other types have neither
+ROOM_FEATURES = {
+    'Suite': 'King bed, living area, mini bar, workspace',
+    'Double': 'Two queen beds, workspace',
+    'Single': 'One queen bed, workspace'
+}
+ROOM_OCCUPANCY = {'Suite': 4, 'Double': 2, 'Single': 1}
+
 class CompleteHotelSystem:
+    # Intent keywords, matched as word prefixes so that e.g. 'booking' and 'cheapest' still count
+    _INTENT_RE = re.compile(
+        r'\b(?:(?P<book>book)|(?P<available>available|vacancy|free)|(?P<price>price|cost|rate|cheap)'
+        r'|(?P<feature>feature|amenity|include)|(?P<info>info|detail))'
+    )
+    _ROOM_RE = re.compile(r'\b(single|double|suite)')
+    # Confirmation and cancellation only count when they are the whole reply
+    _CONFIRM_WORDS = frozenset(['yes', 'confirm', 'okay', 'sure'])
+    _CANCEL_WORDS = frozenset(['no', 'cancel'])
+
     def __init__(self, data_source):
         # Validate data source
         if not data_source:
             raise ValueError("Data source path is required.")
         
-        # If a CSV file is provided, load it into an in-memory SQLite database
+        # Rooms are kept in a pandas DataFrame; every query is answered from it
         if data_source.endswith(".csv"):
-            self.engine = create_engine('sqlite:///:memory:')
+            self.engine = None
+            self.conn = None
             try:
-                df = pd.read_csv(data_source)
-                
-                # Validate required columns
-                required_columns = ['id', 'type', 'price', 'availability']
-                missing_columns = [col for col in required_columns if col not in df.columns]
-                if missing_columns:
-                    raise ValueError(f"CSV file is missing required columns: {missing_columns}")
-                
-                # Ensure data types are correct
-                df['id'] = df['id'].astype(int)
-                df['price'] = df['price'].astype(float)
-                df['availability'] = df['availability'].astype(str)
-                
-                # Load data into SQLite
-                df.to_sql('rooms', self.engine, if_exists='replace', index=False)
-                
+                self.df = self.validate_rooms(pd.read_csv(data_source, dtype=ROOM_DTYPES))
             except Exception as e:
                 raise ValueError(f"Error loading CSV file: {str(e)}")
         else:
-            # Otherwise, assume it's a SQLite database file
+            # Otherwise, assume it's a SQLite database file; bookings are written back to it
             self.engine = create_engine(f'sqlite:///{data_source}')
+            # One long-lived connection; access is already serialized per hotel system
+            self.conn = self.engine.connect()
+            self.df = self.validate_rooms(pd.read_sql_query(text("SELECT * FROM rooms"), self.conn, dtype=ROOM_DTYPES))
         
+        # Pending booking for the single-guest CLI; other callers pass their own booking_state
         self.current_booking = None
+        # The hotel system may be shared by several sessions; bookings must not interleave
+        self._lock = threading.RLock()
+        # Query results keyed by (query_type, params), cleared whenever a room is booked
+        self._cache = {}
+        self.refresh_availability()
+
+    def validate_rooms(self, df):
+        """Check that the rooms table has the required columns; types are set by ROOM_DTYPES when it is read"""
+        # Validate required columns
+        required_columns = ['id', 'type', 'price', 'availability']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"CSV file is missing required columns: {missing_columns}")
+        return df
         
-    def execute_query(self, query, params=None):
-        """Execute a SQL query and return results"""
-        with self.engine.connect() as conn:
-            if params:
-                result = conn.execute(text(query), params)
-            else:
-                result = conn.execute(text(query))
-            return result.fetchall()
+    def close(self):
+        """Close the database connection, if the rooms come from a database file"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.engine.dispose()
 
     def execute_update(self, query, params=None):
         """Execute an update query within a transaction"""
-        with self.engine.begin() as conn:
-            if params:
-                conn.execute(text(query), params)
-            else:
-                conn.execute(text(query))
+        try:
+            self.conn.execute(text(query), params or {})
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def run_query(self, query_type, params=None):
+        """Run a room query against the DataFrame and return its rows as tuples"""
+        params = params or {}
+        key = (query_type, tuple(sorted(params.items())))
+        return self._cached(key, lambda: self.get_query_by_type(query_type)(**params))
+
+    def _cached(self, key, fn):
+        # Computing under the lock means a result can't be stored after a booking has cleared the cache
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            value = self._cache[key] = fn()
+            return value
 
     def get_query_by_type(self, query_type):
-        """Return the appropriate SQL query based on query type"""
+        """Return the appropriate room query based on query type"""
         queries = {
             # 1. Availability Queries
-            "check_all_availability": """
-                SELECT type, COUNT(*) as available_rooms, price
-                FROM rooms 
-                WHERE availability = 'Available'
-                GROUP BY type, price
-                ORDER BY price;
-            """,
-            "check_specific_room_type": """
-                SELECT id, price
-                FROM rooms
-                WHERE type = :room_type 
-                AND availability = 'Available';
-            """,
+            "check_all_availability": self.check_all_availability,
+            "check_specific_room_type": self.check_specific_room_type,
             # 2. Price Queries
-            "price_range": """
-                SELECT type, price, COUNT(*) as room_count
-                FROM rooms
-                WHERE availability = 'Available'
-                AND price BETWEEN :min_price AND :max_price
-                GROUP BY type, price
-                ORDER BY price;
-            """,
-            "cheapest_available": """
-                SELECT type, price
-                FROM rooms
-                WHERE availability = 'Available'
-                ORDER BY price ASC
-                LIMIT 1;
-            """,
+            "price_range": self.price_range,
+            "cheapest_available": self.cheapest_available,
             # 3. Room Features
-            "room_features": """
-                SELECT type, price,
-                    CASE 
-                        WHEN type = 'Suite' THEN 'King bed, living area, mini bar, workspace'
-                        WHEN type = 'Double' THEN 'Two queen beds, workspace'
-                        WHEN type = 'Single' THEN 'One queen bed, workspace'
-                    END as features
-                FROM rooms
-                WHERE availability = 'Available'
-                GROUP BY type, price;
-            """,
+            "room_features": self.room_features,
             # 4. Comprehensive Room Info
-            "all_room_info": """
-                SELECT 
-                    r.type,
-                    r.price,
-                    COUNT(*) as available_rooms,
-                    CASE 
-                        WHEN r.type = 'Suite' THEN 'King bed, living area, mini bar, workspace'
-                        WHEN r.type = 'Double' THEN 'Two queen beds, workspace'
-                        WHEN r.type = 'Single' THEN 'One queen bed, workspace'
-                    END as features,
-                    CASE 
-                        WHEN r.type = 'Suite' THEN 4
-                        WHEN r.type = 'Double' THEN 2
-                        WHEN r.type = 'Single' THEN 1
-                    END as max_occupancy
-                FROM rooms r
-                WHERE r.availability = 'Available'
-                GROUP BY r.type, r.price
-                ORDER BY r.price;
-            """
+            "all_room_info": self.all_room_info
         }
-        return queries.get(query_type, "")
+        return queries[query_type]
+
+    def refresh_availability(self):
+        """Recompute the available-room views; called on load and whenever a room is booked"""
+        with self._lock:
+            self._avail = self.df[self.df['availability'] == 'Available']
+            # (type, price, available_rooms), grouped once and shared by the summary queries
+            self._avail_counts = (self._avail.groupby(['type', 'price'], sort=True).size()
+                                  .reset_index(name='available_rooms'))
+            self._cache.clear()
+
+    def check_all_availability(self):
+        """(type, available_rooms, price) for each available type and price, cheapest first"""
+        counts = self._avail_counts.sort_values('price', kind='stable')
+        return list(counts[['type', 'available_rooms', 'price']].itertuples(index=False, name=None))
+
+    def check_specific_room_type(self, room_type):
+        """(id, price) of every available room of the given type"""
+        rooms = self._avail
+        rooms = rooms[rooms['type'] == room_type]
+        return list(rooms[['id', 'price']].itertuples(index=False, name=None))
+
+    def price_range(self, min_price, max_price):
+        """(type, price, room_count) for available rooms within the price range, cheapest first"""
+        rooms = self._avail
+        rooms = rooms[rooms['price'].between(min_price, max_price)]
+        counts = (rooms.groupby(['type', 'price']).size()
+                  .reset_index(name='room_count')
+                  .sort_values('price', kind='stable'))
+        return list(counts.itertuples(index=False, name=None))
+
+    def cheapest_available(self):
+        """(type, price) of the cheapest available room"""
+        rooms = self._avail
+        if rooms.empty:
+            return []
+        cheapest = rooms.loc[rooms['price'].idxmin()]
+        return [(cheapest['type'], cheapest['price'])]
+
+    def room_features(self):
+        """(type, price, features) for each available type and price"""
+        groups = self._avail_counts[['type', 'price']].itertuples(index=False, name=None)
+        return [(room_type, price, ROOM_FEATURES.get(room_type)) for room_type, price in groups]
+
+    def all_room_info(self):
+        """(type, price, available_rooms, features, max_occupancy) for each available type and price, cheapest first"""
+        counts = self._avail_counts.sort_values('price', kind='stable')
+        return [
+            (room_type, price, available, ROOM_FEATURES.get(room_type), ROOM_OCCUPANCY.get(room_type))
+            for room_type, price, available in counts.itertuples(index=False, name=None)
+        ]
 
     def book_room(self, room_id):
-        """Update room status to booked"""
-        query = """
-            UPDATE rooms 
-            SET availability = 'Booked' 
-            WHERE id = :room_id;
-        """
-        self.execute_update(query, {"room_id": room_id})
+        """Update room status to booked; returns False if the room is no longer available"""
+        with self._lock:
+            room = (self.df['id'] == room_id) & (self.df['availability'] == 'Available')
+            if not room.any():
+                return False
+            
+            # Persist the booking when the rooms come from a database file
+            if self.engine is not None:
+                query = """
+                    UPDATE rooms 
+                    SET availability = 'Booked' 
+                    WHERE id = :room_id;
+                """
+                self.execute_update(query, {"room_id": int(room_id)})
+            
+            self.df.loc[room, 'availability'] = 'Booked'
+            self.refresh_availability()
+            return True
 
-    def process_user_query(self, user_input):
-        """Process natural language queries and handle requests"""
-        user_input = user_input.lower()
+    def process_user_query(self, user_input, normalized=False, booking_state=None):
+        """Process natural language queries and handle requests.
+
+        Pass normalized=True when user_input is already lowercased. booking_state is the
+        object whose current_booking holds this guest's pending booking; it defaults to
+        the hotel system itself, which is only right when there is a single guest.
+        """
+        if booking_state is None:
+            booking_state = self
+        if not normalized:
+            user_input = user_input.lower()
+        # One pass over the input collects every intent keyword; branches below decide precedence
+        intents = {m.lastgroup for m in self._INTENT_RE.finditer(user_input)}
+        room_match = self._ROOM_RE.search(user_input)
+        requested_type = room_match.group(1).capitalize() if room_match else None
         
         try:
             # 1. Handle Booking Requests
-            if 'book' in user_input:
-                room_types = {'single': 'Single', 'double': 'Double', 'suite': 'Suite'}
-                requested_type = next((room_types[rt] for rt in room_types if rt in user_input), None)
+            if 'book' in intents:
                 
                 if requested_type:
-                    results = self.execute_query(
-                        self.get_query_by_type("check_specific_room_type"),
-                        {"room_type": requested_type}
-                    )
+                    results = self.run_query("check_specific_room_type", {"room_type": requested_type})
                     
                     if results:
                         room_id, price = results[0]
-                        self.current_booking = {
+                        booking_state.current_booking = {
                             'room_id': room_id,
                             'room_type': requested_type,
                             'price': price
@@ -170,43 +225,45 @@ class CompleteHotelSystem:
                     }
             
             # 2. Handle Booking Confirmation
-            elif user_input in ['yes', 'confirm', 'okay', 'sure'] and self.current_booking:
-                self.book_room(self.current_booking['room_id'])
-                response = (f"Great! I've booked your {self.current_booking['room_type']} room. "
-                            f"The total cost is ${self.current_booking['price']:.2f} per night. "
+            elif user_input in self._CONFIRM_WORDS and booking_state.current_booking:
+                booking = booking_state.current_booking
+                booking_state.current_booking = None
+                if not self.book_room(booking['room_id']):
+                    return {
+                        'action': 'error',
+                        'message': (f"I'm sorry, that {booking['room_type']} room was just booked by another guest. "
+                                    "Please ask to book again and I'll find you another one.")
+                    }
+                response = (f"Great! I've booked your {booking['room_type']} room. "
+                            f"The total cost is ${booking['price']:.2f} per night. "
                             "Thank you for choosing our hotel!")
-                self.current_booking = None
                 return {'action': 'confirmed', 'message': response}
             
             # 3. Handle Booking Cancellation
-            elif user_input in ['no', 'cancel']:
-                self.current_booking = None
+            elif user_input in self._CANCEL_WORDS:
+                booking_state.current_booking = None
                 return {
                     'action': 'cancel',
                     'message': "Booking cancelled. Is there anything else I can help you with?"
                 }
             
             # 4. Handle Availability Queries
-            elif any(word in user_input for word in ['available', 'vacancy', 'free']):
-                if any(rt in user_input for rt in ['single', 'double', 'suite']):
-                    room_type = next(rt for rt in ['Single', 'Double', 'Suite'] if rt.lower() in user_input)
-                    results = self.execute_query(
-                        self.get_query_by_type("check_specific_room_type"),
-                        {"room_type": room_type}
-                    )
+            elif 'available' in intents:
+                if requested_type:
+                    results = self.run_query("check_specific_room_type", {"room_type": requested_type})
                     available_count = len(results)
                     if available_count > 0:
                         return {
                             'action': 'info',
-                            'message': f"Yes, we have {available_count} {room_type} room(s) available at ${results[0][1]:.2f} per night."
+                            'message': f"Yes, we have {available_count} {requested_type} room(s) available at ${results[0][1]:.2f} per night."
                         }
                     else:
                         return {
                             'action': 'info',
-                            'message': f"Sorry, there are no available {room_type} rooms at the moment."
+                            'message': f"Sorry, there are no available {requested_type} rooms at the moment."
                         }
                 else:
-                    results = self.execute_query(self.get_query_by_type("check_all_availability"))
+                    results = self.run_query("check_all_availability")
                     if results:
                         available_rooms = [f"{r[0]}: {r[1]} room(s) at ${r[2]:.2f}" for r in results]
                         return {
@@ -220,16 +277,16 @@ class CompleteHotelSystem:
                         }
             
             # 5. Handle Price Queries
-            elif any(word in user_input for word in ['price', 'cost', 'rate', 'cheap']):
+            elif 'price' in intents:
                 if 'cheapest' in user_input:
-                    results = self.execute_query(self.get_query_by_type("cheapest_available"))
+                    results = self.run_query("cheapest_available")
                     if results:
                         return {
                             'action': 'info',
                             'message': f"Our most economical option is a {results[0][0]} room at ${results[0][1]:.2f} per night."
                         }
                 else:
-                    results = self.execute_query(self.get_query_by_type("room_features"))
+                    results = self.run_query("room_features")
                     if results:
                         price_info = [f"{r[0]} (${r[1]:.2f}): {r[2]}" for r in results]
                         return {
@@ -238,8 +295,8 @@ class CompleteHotelSystem:
                         }
             
             # 6. Handle Feature Queries
-            elif any(word in user_input for word in ['feature', 'amenity', 'include']):
-                results = self.execute_query(self.get_query_by_type("room_features"))
+            elif 'feature' in intents:
+                results = self.run_query("room_features")
                 if results:
                     features = [f"{r[0]} (${r[1]:.2f}): {r[2]}" for r in results]
                     return {
@@ -248,8 +305,8 @@ class CompleteHotelSystem:
                     }
             
             # 7. Handle General Information Request
-            elif 'info' in user_input or 'detail' in user_input:
-                results = self.execute_query(self.get_query_by_type("all_room_info"))
+            elif 'info' in intents:
+                results = self.run_query("all_room_info")
                 if results:
                     info = [
                         f"{r[0]} - ${r[1]:.2f}/night\n"
@@ -300,6 +357,8 @@ def main():
             
             response = hotel_system.process_user_query(user_input)
             print(f"\nAssistant: {response['message']}")
+        
+        hotel_system.close()
 
     except Exception as e:
         print(f"Error initializing the system: {str(e)}")
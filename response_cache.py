@@ -0,0 +1,34 @@
+# response_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after they are stored"""
+
+    def __init__(self, ttl=600, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            # Evict the least recently used entries once over capacity
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)